@@ -1,7 +1,70 @@
+import functools
 import itertools
 import random
 import math
-import copy
+
+
+def iter_bits(mask):
+    """
+    Yields every set bit of `mask` as its own single-bit int, lowest first.
+    """
+    while mask:
+        bit = mask & -mask
+        yield bit
+        mask ^= bit
+
+
+def popcount(mask):
+    """
+    Returns the number of set bits in `mask`.
+    """
+    return bin(mask).count("1")
+
+
+@functools.lru_cache(maxsize=None)
+def neighbors_of(height, width, i, j):
+    """
+    :return: a tuple of all (r, c) cells within one row and column of (i, j)
+             on a height x width board, not including (i, j) itself
+    """
+    return tuple((r, c)
+                 for r in range(i - 1, i + 2)
+                 for c in range(j - 1, j + 2)
+                 if (r, c) != (i, j) and 0 <= r < height and 0 <= c < width)
+
+
+def infer_subsets(cells, counts, excluded):
+    """
+    Applies the subset method to a packed knowledge base.
+
+    :param cells: list of sentence cell masks
+    :param counts: list of sentence mine counts, parallel to cells
+    :param excluded: mask of cells that are already settled
+    :return: a list of (mask, count) pairs inferred from every sentence
+             that is a strict subset of another
+    """
+    inferred = []
+    for i, j in itertools.combinations(range(len(cells)), 2):
+        a = cells[i]
+        b = cells[j]
+        # sentences sharing no cells cannot be subsets of one another
+        if not a & b:
+            continue
+        # equal sizes can only be a subset if identical, which teaches nothing
+        size_a = popcount(a)
+        size_b = popcount(b)
+        if size_a == size_b:
+            continue
+        # make `a` the smaller one so only one direction needs testing
+        if size_a > size_b:
+            i, j, a, b = j, i, b, a
+        if a & ~b:
+            continue
+        # the difference holds count(b) - count(a) mines
+        difference = b & ~a & ~excluded
+        if difference:
+            inferred.append((difference, counts[j] - counts[i]))
+    return inferred
 
 
 class Minesweeper():
@@ -16,21 +79,22 @@ class Minesweeper():
         self.width = width
         self.mines = set()
 
-        # Initialize an empty field with no mines
-        self.board = []
-        for i in range(self.height):
-            row = []
-            for j in range(self.width):
-                row.append(False)
-            self.board.append(row)
+        # Pick distinct mine positions in one draw instead of retrying on collisions
+        for index in random.sample(range(height * width), mines):
+            self.mines.add(divmod(index, width))
+
+        # Lay the mines out on the field
+        self.board = [
+            [(i, j) in self.mines for j in range(width)]
+            for i in range(height)
+        ]
 
-        # Add mines randomly
-        while len(self.mines) != mines:
-            i = random.randrange(height)
-            j = random.randrange(width)
-            if not self.board[i][j]:
-                self.mines.add((i, j))
-                self.board[i][j] = True
+        # Mines never move, so count every cell's nearby mines once,
+        # indexed by i * width + j
+        self._nearby_mine_count = [
+            sum(self.board[r][c] for r, c in neighbors_of(height, width, i, j))
+            for i in range(height) for j in range(width)
+        ]
 
         # At first, player has found no mines
         self.mines_found = set()
@@ -65,23 +129,7 @@ class Minesweeper():
         not including the cell itself.
         """
 
-        # Keep count of nearby mines
-        count = 0
-
-        # Loop over all cells within one row and column
-        for i in range(cell[0] - 1, cell[0] + 2):
-            for j in range(cell[1] - 1, cell[1] + 2):
-
-                # Ignore the cell itself
-                if (i, j) == cell:
-                    continue
-
-                # Update count if cell in bounds and is mine
-                if 0 <= i < self.height and 0 <= j < self.width:
-                    if self.board[i][j]:
-                        count += 1
-
-        return count
+        return self._nearby_mine_count[cell[0] * self.width + cell[1]]
 
     def won(self):
         """
@@ -95,52 +143,79 @@ class Sentence():
     Logical statement about a Minesweeper game
     A sentence consists of a set of board cells,
     and a count of the number of those cells which are mines.
+
+    Cells are stored as an int bitmask where cell (i, j) is bit i * width + j,
+    so a sentence also keeps the width of the board it describes.
     """
 
-    def __init__(self, cells, count):
-        self.cells = set(cells)
+    __slots__ = ("cells", "count", "width")
+
+    def __init__(self, cells, count, width):
+        # accept either a ready-made mask or an iterable of (i, j) cells
+        if not isinstance(cells, int):
+            mask = 0
+            for i, j in cells:
+                mask |= 1 << (i * width + j)
+            cells = mask
+        self.cells = cells
         self.count = count
+        self.width = width
 
     def __eq__(self, other):
+        if not isinstance(other, Sentence):
+            return NotImplemented
         return self.cells == other.cells and self.count == other.count
 
     def __str__(self):
-        return f"{self.cells} = {self.count}"
+        cells = sorted(divmod(bit.bit_length() - 1, self.width) for bit in iter_bits(self.cells))
+        return f"{{{', '.join(map(str, cells))}}} = {self.count}"
 
     def known_mines(self):
         """
-        Returns the set of all cells in self.cells known to be mines.
+        Returns the mask of all cells in self.cells known to be mines.
         """
-        if len(self.cells) == self.count:
+        if popcount(self.cells) == self.count:
             return self.cells
-        return set()
+        return 0
 
     def known_safes(self):
         """
-        Returns the set of all cells in self.cells known to be safe.
+        Returns the mask of all cells in self.cells known to be safe.
         """
         if self.count == 0:
             return self.cells
-        return set()
+        return 0
 
-    def mark_mine(self, cell):
+    def mark_mine(self, bit):
         """
         Updates internal knowledge representation given the fact that
-        a cell is known to be a mine.
+        the cell in the single-bit mask `bit` is known to be a mine.
         """
-        clone = self.cells.copy()
-        for cell0 in clone:
-            if cell0 == cell:
-                self.cells.discard(cell)
-                self.count -= 1
-                break
+        self.mark_mines(bit)
 
-    def mark_safe(self, cell):
+    def mark_mines(self, mines):
+        """
+        Updates internal knowledge representation given the fact that
+        every cell in the `mines` mask is known to be a mine.
+        """
+        hit = self.cells & mines
+        if hit:
+            self.cells ^= hit
+            self.count -= popcount(hit)
+
+    def mark_safe(self, bit):
+        """
+        Updates internal knowledge representation given the fact that
+        the cell in the single-bit mask `bit` is known to be safe.
+        """
+        self.mark_safes(bit)
+
+    def mark_safes(self, safes):
         """
         Updates internal knowledge representation given the fact that
-        a cell is known to be safe.
+        every cell in the `safes` mask is known to be safe.
         """
-        self.cells.discard(cell)
+        self.cells &= ~safes
 
 
 class MinesweeperAI():
@@ -154,31 +229,88 @@ class MinesweeperAI():
         self.height = height
         self.width = width
 
-        # Keep track of which cells have been clicked on
-        self.moves_made = set()
+        # Mask with a bit set for every cell on the board
+        self._board = (1 << (height * width)) - 1
 
-        # Keep track of cells known to be safe or mines
-        self.mines = set()
-        self.safes = set()
+        # Keep track of which cells have been clicked on, as a bitmask
+        self._moves_made = 0
+
+        # Keep track of cells known to be safe or mines, as bitmasks
+        self._mines = 0
+        self._safes = 0
 
         # List of sentences about the game known to be true
         self.knowledge = []
 
+        # (cells, count) keys of the sentences in self.knowledge, rebuilt by
+        # clean_knowledge after marking has changed sentences
+        self._kb_keys = set()
+
+        # Precompute each cell's neighbors as a single mask, indexed by i * width + j
+        self._neighbor_masks = [
+            sum(self.bit_of(neighbor) for neighbor in neighbors_of(height, width, i, j))
+            for i in range(height) for j in range(width)
+        ]
+
+    @property
+    def moves_made(self):
+        """
+        Read-only view of the (i, j) cells that have been clicked on,
+        decoded from self._moves_made on every access.
+        """
+        return self.cells_of(self._moves_made)
+
+    @property
+    def mines(self):
+        """
+        Read-only view of the (i, j) cells known to be mines,
+        decoded from self._mines on every access.
+        """
+        return self.cells_of(self._mines)
+
+    @property
+    def safes(self):
+        """
+        Read-only view of the (i, j) cells known to be safe,
+        decoded from self._safes on every access.
+        """
+        return self.cells_of(self._safes)
+
+    def bit_of(self, cell):
+        """
+        :param cell: (i, j)
+        :return: the single-bit mask standing for that cell
+        """
+        return 1 << (cell[0] * self.width + cell[1])
+
+    def cells_of(self, mask):
+        """
+        :param mask: bitmask of cells
+        :return: a frozenset of the (i, j) cells whose bits are set in mask
+        """
+        return frozenset(divmod(bit.bit_length() - 1, self.width) for bit in iter_bits(mask))
+
     def mark_mine(self, cell):
         """
         Marks a cell as a mine, and updates all knowledge
         to mark that cell as a mine as well.
         """
+        bit = self.bit_of(cell)
+        self._mines |= bit
+        self._safes &= ~bit
         for sentence in self.knowledge:
-            sentence.mark_mine(cell)
+            sentence.mark_mine(bit)
 
     def mark_safe(self, cell):
         """
         Marks a cell as safe, and updates all knowledge
         to mark that cell as safe as well.
         """
+        bit = self.bit_of(cell)
+        # a move already made is never offered again as a safe move
+        self._safes |= bit & ~self._moves_made
         for sentence in self.knowledge:
-            sentence.mark_safe(cell)
+            sentence.mark_safe(bit)
 
     def add_knowledge(self, cell, count):
         """
@@ -197,7 +329,7 @@ class MinesweeperAI():
         """
         # Mark the cell as a move that has been made
         ################################################################################################################
-        self.moves_made.add(cell)
+        self._moves_made |= self.bit_of(cell)
         ################################################################################################################
 
         # Mark the cell as safe: removing this particular cell from any sentence if it does exist
@@ -211,165 +343,110 @@ class MinesweeperAI():
         # into consideration if a neighboring cell is already in self.mines or self.safes or self.made_moves
         # and decrement the count and the neighboring cells accordingly.
         ################################################################################################################
-        # a list to hold neighboring cells
-        cells = []
-        # iterate through all neighboring cells
-        for cell1 in self.neighbors(cell):
-            # if a neighboring cell is already marked as a mine then
-            # decrement the count by one and do not append it to cells.
-            if cell1 in self.mines:
-                count -= 1
-                continue
-            # if a neighboring cell is already marked as a safe or made cell then don't append it to cells
-            if cell1 in self.safes or cell1 in self.moves_made:
-                continue
-            # otherwise append it to cells
-            cells.append(cell1)
+        neighbors = self._neighbor_masks[cell[0] * self.width + cell[1]]
+        # neighboring cells already marked as mines are accounted for in the count
+        count -= popcount(neighbors & self._mines)
+        # and neither those nor the ones already marked as safe or made belong in the sentence
+        cells = neighbors & ~(self._mines | self._safes | self._moves_made)
         # if there is any cell remained after all that filtering then proceed with composing a sentence
-        if len(cells):
-            new_sentence = Sentence(cells, count)
-            # one more condition before committing to adding new_sentence: make sure it is a new sentence for real!
+        if cells:
+            # one more condition before committing to adding the sentence: make sure it is a new sentence for real!
             # (I know I might be unnecessarily extra cautious but I am so afraid of repetitions and confusing the AI)
-            if new_sentence not in self.knowledge:
-                self.knowledge.append(Sentence(cells, count))
+            key = (cells, count)
+            if key not in self._kb_keys:
+                self._kb_keys.add(key)
+                self.knowledge.append(Sentence(cells, count, self.width))
         ################################################################################################################
 
 
-        # Mark any additional cells as safe or as mines
-        # if it can be concluded based on the AI's knowledge base
-        ################################################################################################################
-        # This function would iterate through the KB's sentences looking for any known mines or safes
-        self.mark_mines_safes()
-        # as I am removing known mines and safes and constantly filtering out AI's sentences, some
-        # sentences would end up either becoming empty with no cells or identical to other sentences.
-        # the following two functions would clean up the KB from such useless sentences
-        self.clean_empty_sentences()
-        self.clean_identical_sentences()
-        ################################################################################################################
-
-
-        # add any new sentences to the AI's knowledge base
-        # if they can be inferred from existing knowledge
-        # via looking for subset sentences
-        ################################################################################################################
-
-        # this list would carry the new inferred sentences
-        sub_sentences = []
-        # this would hold the difference of the counts of subset and the sentence
-        count_subset = -1
-        # make a copy so I can modify while iterating
-        copy_knowledge = copy.deepcopy(self.knowledge)
-
-        # catch the first sentence
-        for sentence in copy_knowledge:
-            # catch another sentence
-            for sentence1 in copy_knowledge:
-                # this list would carry the cells resulting from subtracting
-                # the subset's cells from the complete sentence's cells
-                is_subset = []
-
-                # basically this condition is asking if the cells of SENTENCE
-                # is a subset of the SENTENCE1 as that would return
-                # an empty set
-                if not sentence.cells.difference(sentence1.cells):
-                    # subtract cells and counts
-                    is_subset = sentence1.cells - sentence.cells
-                    count_subset = abs(sentence1.count - sentence.count)
-
-            # now that I have the cells resulting from the above process
-            # I will make a deep copy and filter out all the cells that are already in moves_made, safes, mines
-            # (even though a shallow copy is enough, I felt deep is safer just in case)
-                is_subset0 = copy.deepcopy(is_subset)
-                for cell in is_subset0:
-                    if cell in self.moves_made or cell in self.safes or cell in self.mines:
-                        is_subset.discard(cell)
-
-                # after all that filtering if any cell left then proceed with making the sentence
-                if is_subset and count_subset != -1:
-                    # the new sentence's cells would be the cells in is_subset and the count would be
-                    # the difference of the subset's count and the sentence count as explained in the
-                    # "the subset method" at the website of this project
-                    new_sentence = Sentence(is_subset, count_subset)
-
-                    # again extra cautious: before appending the sentence
-                    # to sub_sentences, make sure it's not already in my KB
-                    if new_sentence not in self.knowledge:
-                        sub_sentences.append(new_sentence)
-
-        # finally add all resultant sentences to self.knowledge
-        for sentence in sub_sentences:
-            self.knowledge.append(sentence)
+        # Mark any additional cells as safe or as mines, and add any new sentences that can be
+        # inferred from existing knowledge via looking for subset sentences. Each of these can
+        # unlock the other, so keep going until neither teaches the AI anything new.
         ################################################################################################################
-
-        # At the very end, do a final cycle of getting, marking, cleaning mines, safes and sentences as there
-        # might be some new mines and safes could be marked for the AI to make a safe move!
-        ################################################################################################################
-        self.mark_mines_safes()
-        self.clean_empty_sentences()
-        self.clean_identical_sentences()
-        self.clean_exceuted_safes()
+        while True:
+            # This function would iterate through the KB's sentences looking for any known mines or safes;
+            # every batch it marks can settle further sentences, so repeat it until nothing new turns up
+            while self.mark_mines_safes():
+                pass
+            # as I am removing known mines and safes and constantly filtering out AI's sentences, some
+            # sentences would end up either becoming empty with no cells or identical to other sentences.
+            # the following function would clean up the KB from such useless sentences
+            self.clean_knowledge()
+
+            # this list would carry the new inferred sentences
+            sub_sentences = []
+            # cells that are already settled never belong in an inferred sentence
+            excluded = self._moves_made | self._safes | self._mines
+
+            inferred = infer_subsets(
+                [sentence.cells for sentence in self.knowledge],
+                [sentence.count for sentence in self.knowledge],
+                excluded,
+            )
+            for key in inferred:
+                # again extra cautious: only keep inferences that are not already in my KB
+                if key not in self._kb_keys:
+                    self._kb_keys.add(key)
+                    sub_sentences.append(Sentence(*key, self.width))
+
+            # nothing left to learn: the KB is at a fixpoint
+            if not sub_sentences:
+                break
+            # otherwise add all resultant sentences to self.knowledge and go around again
+            self.knowledge.extend(sub_sentences)
         ################################################################################################################
 
     def mark_mines_safes(self):
         """
         this function would check if there is any known mines or safes
         and update self.mines and self.safes.
-        """
-        for sentence in self.knowledge:
-            mines_of_sentence = copy.deepcopy(sentence.known_mines())
-            safes_of_sentence = copy.deepcopy(sentence.known_safes())
-            if len(mines_of_sentence):
-                for cell in mines_of_sentence:
-                    self.mark_mine(cell)
-                    self.mines.add(cell)
-            if len(safes_of_sentence):
-                for cell in safes_of_sentence:
-                    if cell not in self.moves_made:
-                        self.mark_safe(cell)
-                        self.safes.add(cell)
-
-    def clean_empty_sentences(self):
-        """
-        this function clears all empty sentences from
-        self.knowledge.
-        """
-        clone = copy.deepcopy(self.knowledge)
-        for sentence in clone:
-            if not sentence.cells:
-                self.knowledge.remove(sentence)
 
-    def clean_identical_sentences(self):
-        """
-        this function delete identical sentences in self.knowledge.
-        """
-        # make a deep copy se I can iterate and alter sentences safely
-        clone = copy.deepcopy(self.knowledge)
-        # set index to 0
-        indx = 0
-        # access all sentences in the deep copy
-        for sentence in clone:
-            # increment the index by one so this sentence ends up
-            # being compared to all following (subsequent) sentences not itself.
-            indx += 1
-            for i in range(indx, len(clone)):
-                if sentence == clone[i]:
-                    # if it is identical then TRY to remove it just in case
-                    # if for some reason it is not eligible then pass without crashing the game
-                    try:
-                        self.knowledge.remove(sentence)
-                    except:
-                        pass
+        A sentence that settles its cells is dropped afterwards, as once
+        they are marked it carries no information.
 
-    def clean_exceuted_safes(self):
-        """
-        another cleaning function that would remove all safes
-        that was already executed in the board as a move.
+        :return: True if this pass settled any sentence, False otherwise
         """
-        clone = copy.deepcopy(self.safes)
-        for cell in clone:
-            if cell in self.moves_made:
-                self.safes.remove(cell)
-
+        remaining = []
+        # collect everything this pass settles, then broadcast it in one sweep
+        new_mines = 0
+        new_safes = 0
+        for sentence in self.knowledge:
+            mines_of_sentence = sentence.known_mines()
+            safes_of_sentence = sentence.known_safes()
+            if not mines_of_sentence and not safes_of_sentence:
+                remaining.append(sentence)
+                continue
+            new_mines |= mines_of_sentence
+            new_safes |= safes_of_sentence & ~self._moves_made
+
+        self._mines |= new_mines
+        self._safes |= new_safes
+        for sentence in remaining:
+            sentence.mark_mines(new_mines)
+            sentence.mark_safes(new_safes)
+        settled = len(remaining) != len(self.knowledge)
+        self.knowledge = remaining
+        return settled
+
+    def clean_knowledge(self):
+        """
+        this function cleans up the KB in a single pass: it drops empty sentences,
+        keeps only the first of any identical sentences, and removes all safes
+        that were already executed in the board as a move or are known mines.
+        """
+        # keep the first sentence seen for every (cells, count) pair
+        seen = set()
+        unique = []
+        for sentence in self.knowledge:
+            if not sentence.cells:
+                continue
+            key = (sentence.cells, sentence.count)
+            if key not in seen:
+                seen.add(key)
+                unique.append(sentence)
+        self.knowledge = unique
+        self._kb_keys = seen
+        self._safes &= ~(self._moves_made | self._mines)
 
     def make_safe_move(self):
         """
@@ -377,13 +454,16 @@ class MinesweeperAI():
         The move must be known to be safe, and not already a move
         that has been made.
 
-        This function may use the knowledge in self.mines, self.safes
-        and self.moves_made, but should not modify any of those values.
+        This function may use the knowledge in self._mines, self._safes
+        and self._moves_made (read-only as self.mines, self.safes and
+        self.moves_made), but should not modify any of those values.
         """
-        for cell in self.safes:
-            if cell not in self.moves_made and cell not in self.mines:
-                return cell
-        return None
+        # clean_knowledge keeps moves made and mines out of self.safes,
+        # so any safe cell will do: take the lowest one
+        if not self._safes:
+            return None
+        bit = self._safes & -self._safes
+        return divmod(bit.bit_length() - 1, self.width)
 
 
     def make_random_move(self):
@@ -393,36 +473,20 @@ class MinesweeperAI():
             1) have not already been chosen, and
             2) are not known to be mines
         """
-        # iterate with random range up to the height of the board
-        for row in range(random.randrange(self.height)):
-            # iterate with random range up to the width of the board
-            for col in range(random.randrange(self.width)):
-                # checking that the cell (row, col) not already executed or marked as a mine
-                if (row, col) not in self.mines and (row, col) not in self.moves_made:
-                    return row, col
-        return None
+        # every cell that is neither clicked on nor known to be a mine is a candidate,
+        # including (0, 0); None only once there is no such cell left
+        available = self._board & ~(self._mines | self._moves_made)
+        if not available:
+            return None
+        # pick the k-th candidate uniformly by clearing the k lowest set bits
+        for _ in range(random.randrange(popcount(available))):
+            available &= available - 1
+        bit = available & -available
+        return divmod(bit.bit_length() - 1, self.width)
 
     def neighbors(self, cell):
         """
         :param cell: cell (i, j) to find its neighbor within one column and one row
         :return: a list of all (i, j) neighboring cells
         """
-        # create an empty cell
-        neighboring_cells = []
-        # up and down within one row
-        for i in range(cell[0] - 1, cell[0] + 2):
-            # up and down within one column
-            for j in range(cell[1] - 1, cell[1] + 2):
-
-                # Ignore the cell itself
-                if (i, j) == cell:
-                    continue
-
-                # Update neighboring_cells list if i, j are not crossing the height and width of the board
-                if 0 <= i < self.height and 0 <= j < self.width:
-                    neighboring_cells.append((i, j))
-
-        return neighboring_cells
-
-
-
+        return list(neighbors_of(self.height, self.width, cell[0], cell[1]))
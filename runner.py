@@ -185,7 +185,7 @@ while True:
             if move is None:
                 move = ai.make_random_move()
                 if move is None:
-                    flags = ai.mines.copy()
+                    flags = set(ai.mines)
                     print("No moves left to make.")
                 else:
                     termcolor.cprint("No known safe moves, AI making random move.", "red")